@@ -2,17 +2,39 @@ import argparse
 from sentence_transformers import SentenceTransformer
 import os
 
-def download_and_save(model_name: str, output_dir: str):
+def download_and_save(model_name: str, output_dir: str, export_onnx: bool = False, quantize: str = None, optimize: str = None):
     print(f"Downloading model '{model_name}'...")
     model = SentenceTransformer(model_name)
     os.makedirs(output_dir, exist_ok=True)
     print(f"Saving model to '{output_dir}'...")
     model.save(output_dir)
+    if export_onnx:
+        # Saved under <output_dir>/onnx, used when EMBEDDING_BACKEND=onnx
+        print("Exporting ONNX model...")
+        onnx_model = SentenceTransformer(model_name, backend="onnx")
+        onnx_model.save(output_dir)
+        if optimize:
+            # Graph-optimized export (fused attention/GELU etc.), saved as onnx/model_<optimize>.onnx
+            from sentence_transformers import export_optimized_onnx_model
+            print(f"Optimizing ONNX model ({optimize})...")
+            export_optimized_onnx_model(onnx_model, optimize, output_dir)
+        if quantize:
+            # Int8 dynamic quantization, saved as onnx/model_qint8_<quantize>.onnx
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            print(f"Quantizing ONNX model to int8 ({quantize})...")
+            export_dynamic_quantized_onnx_model(onnx_model, quantize, output_dir)
     print("Done.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Download and save a Sentence Transformers model for offline use.")
     parser.add_argument("--model", type=str, required=True, help="HuggingFace model name, e.g. 'bge-small-en-v1.5-sbert'")
     parser.add_argument("--output", type=str, required=True, help="Output directory to save the model")
+    parser.add_argument("--onnx", action="store_true", help="Also export the model to ONNX for ONNX Runtime inference")
+    parser.add_argument("--quantize", type=str, choices=["arm64", "avx2", "avx512", "avx512_vnni"], help="Also export an int8 quantized ONNX model for this CPU target (requires --onnx)")
+    parser.add_argument("--optimize", type=str, choices=["O1", "O2", "O3", "O4"], help="Also export a graph-optimized ONNX model at this Optimum level (requires --onnx; O4 targets GPU)")
     args = parser.parse_args()
-    download_and_save(args.model, args.output) 
\ No newline at end of file
+    if args.quantize and not args.onnx:
+        parser.error("--quantize requires --onnx")
+    if args.optimize and not args.onnx:
+        parser.error("--optimize requires --onnx")
+    download_and_save(args.model, args.output, export_onnx=args.onnx, quantize=args.quantize, optimize=args.optimize) 
\ No newline at end of file
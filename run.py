@@ -6,10 +6,27 @@ from src.config import settings
 
 if __name__ == "__main__":
     print(f"Starting server on {settings.HOST}:{settings.PORT}")
-    uvicorn.run(
-        "src.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        workers=settings.WORKERS,
-        reload=True
-    ) 
\ No newline at end of file
+    if settings.DEBUG:
+        uvicorn.run(
+            "src.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True
+        )
+    else:
+        workers = settings.WORKERS
+        if workers > 1 and not settings.CHROMA_HOST:
+            # The embedded Chroma store cannot be shared by several processes
+            print(f"WORKERS={workers} requires a Chroma server (CHROMA_HOST); starting 1 worker instead")
+            workers = 1
+        uvicorn.run(
+            "src.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=workers,
+            # "auto" picks uvloop and httptools when they are installed (uvloop is not available on Windows)
+            loop="auto",
+            http="auto",
+            limit_concurrency=settings.LIMIT_CONCURRENCY,
+            reload=False
+        )
\ No newline at end of file
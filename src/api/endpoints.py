@@ -1,26 +1,23 @@
 """
 FastAPI endpoints for the question generation service.
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile, File, Form, Depends, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from src.api.schemas import (
-    QuestionResponse, GenerateQuestionsRequest, DocumentsResponse
+    QuestionResponse, GenerateQuestionsRequest, DocumentsResponse, JobResponse
 )
-from src.models.engine import LLMEngine
+from src.models.engine import LLMEngine, get_engine
 
 from src.api.services.question_service import QuestionGenerationService
-from src.api.services.document_service import DocumentService
+from src.api.services.document_service import DocumentService, UploadTooLargeError
 from src.api.services.index_service import IndexService
+from src.api.services.job_service import JobService
 
 
 router = APIRouter()
-engine = LLMEngine()
-
-
-def get_engine():
-    """Dependency to get the LLM engine."""
-    return engine
 
 
 @router.post("/questions/generate", response_model=QuestionResponse)
@@ -31,20 +28,51 @@ async def generate_questions(
     """
     Generate multiple-choice questions from documents.
     """
+    await _require_index(engine)
     service = QuestionGenerationService(engine)
-    result = service.generate_questions(num_questions=request.num_questions)
+    result = await service.generate_questions(num_questions=request.num_questions)
     if result is None:
         raise HTTPException(status_code=404, detail="No documents found")
-    return result
+    # Questions are built server-side, so serialize them with orjson without response_model re-validation
+    return ORJSONResponse(content=result.model_dump())
+
+
+@router.post("/questions/generate/stream")
+async def stream_questions(
+    request: GenerateQuestionsRequest,
+    engine: LLMEngine = Depends(get_engine)
+):
+    """
+    Generate questions like /questions/generate, streamed as NDJSON with one question per line as soon as it is parsed.
+    """
+    await _require_index(engine)
+    service = QuestionGenerationService(engine)
+    questions = await service.stream_questions(num_questions=request.num_questions)
+    if questions is None:
+        raise HTTPException(status_code=404, detail="No documents found")
+    return StreamingResponse(
+        (orjson.dumps(question.model_dump()) + b"\n" async for question in questions),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _require_index(engine: LLMEngine):
+    # Another worker may have built the index since this one started, so try loading it first
+    if not engine.index and not await run_in_threadpool(engine.load_index):
+        raise HTTPException(
+            status_code=503,
+            detail="Index is not ready. Upload documents and rebuild the index."
+        )
 
 
 @router.get("/documents", response_model=DocumentsResponse)
 async def list_documents():
     service = DocumentService()
-    return service.list_documents()
+    # The listing is built server-side, so skip response_model re-validation
+    return ORJSONResponse(content=service.list_documents().model_dump())
 
 
-@router.post("/documents/upload")
+@router.post("/documents/upload", status_code=201)
 async def upload_document(
     file: UploadFile = File(...),
     description: str = Form(None)
@@ -52,24 +80,41 @@ async def upload_document(
     service = DocumentService()
     try:
         result = await service.upload_document(file, description)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    return JSONResponse(status_code=201, content=result)
+    return result
 
 
-@router.post("/index/rebuild")
+@router.post("/index/rebuild", response_model=JobResponse, status_code=202)
 async def rebuild_index(
+    background_tasks: BackgroundTasks,
     engine: LLMEngine = Depends(get_engine)
 ):
-    service = IndexService(engine)
-    result, status = service.rebuild_index()
-    return JSONResponse(status_code=status, content=result)
+    """
+    Queue an index rebuild and return its job; poll /jobs/{job_id} for the result.
+    """
+    jobs = JobService()
+    job = jobs.create_job("index_rebuild")
+    background_tasks.add_task(jobs.run_job, job["id"], IndexService(engine).rebuild_index)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    job = JobService().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.delete("/index")
 async def clear_index(
+    response: Response,
     engine: LLMEngine = Depends(get_engine)
 ):
     service = IndexService(engine)
-    result, status = service.clear_index()
-    return JSONResponse(status_code=status, content=result) 
\ No newline at end of file
+    # Waits on the index lock while another worker rebuilds, so keep it off the event loop
+    result, response.status_code = await run_in_threadpool(service.clear_index)
+    return result 
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+ASGI middleware for the API.
+"""
+from starlette.responses import PlainTextResponse
+
+
+class _BodyTooLargeError(Exception):
+    pass
+
+
+class MaxBodySizeMiddleware:
+    """
+    Reject requests whose body exceeds a limit with 413.
+
+    A declared Content-Length is checked before any body is read; bodies without one
+    (chunked transfer) are counted as they arrive and cut off as soon as they pass the limit,
+    before the framework spools the rest of the request to disk.
+    """
+
+    def __init__(self, app, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_body_size:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    too_large = True
+                    raise _BodyTooLargeError()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if too_large:
+                # The app may answer the cut-off body itself (FastAPI reports a 400 parse error); send 413 instead
+                if not response_started:
+                    response_started = True
+                    await self._reject(scope, receive, send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLargeError:
+            if not response_started:
+                await self._reject(scope, receive, send)
+
+    @staticmethod
+    async def _reject(scope, receive, send):
+        response = PlainTextResponse("Request body too large", status_code=413)
+        await response(scope, receive, send)
@@ -1,18 +1,25 @@
 """
 Pydantic schemas for API data validation.
 """
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+# Response schemas are only built server-side, so they are immutable once constructed
+RESPONSE_MODEL_CONFIG = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
 
 
 class Option(BaseModel):
     """Schema for a question option."""
+    model_config = RESPONSE_MODEL_CONFIG
+
     text: str = Field(..., description="Text of the option")
     label: str = Field(..., description="Label (A, B, C, D) of the option")
 
 
 class QuestionBase(BaseModel):
     """Base schema for a multiple choice question."""
+    model_config = RESPONSE_MODEL_CONFIG
+
     question: str = Field(..., description="Question text")
     options: List[Option] = Field(..., description="Available options")
     correct_answer: str = Field(..., description="Correct option letter (A, B, C, D)")
@@ -34,6 +41,8 @@ class Question(QuestionBase):
 
 class QuestionResponse(BaseModel):
     """Response schema for returning questions."""
+    model_config = RESPONSE_MODEL_CONFIG
+
     questions: List[Question] = Field(..., description="List of questions")
     count: int = Field(..., description="Number of questions")
 
@@ -45,6 +54,8 @@ class GenerateQuestionsRequest(BaseModel):
 
 class DocumentMetadata(BaseModel):
     """Schema for document metadata."""
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str = Field(..., description="Document ID")
     filename: str = Field(..., description="Original filename")
     size: int = Field(..., description="Document size in bytes")
@@ -53,5 +64,19 @@ class DocumentMetadata(BaseModel):
 
 class DocumentsResponse(BaseModel):
     """Schema for listing documents."""
+    model_config = RESPONSE_MODEL_CONFIG
+
     documents: List[DocumentMetadata] = Field(..., description="List of documents")
-    count: int = Field(..., description="Number of documents") 
\ No newline at end of file
+    count: int = Field(..., description="Number of documents") 
+
+
+class JobResponse(BaseModel):
+    """Schema for a background job."""
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: str = Field(..., description="Job ID")
+    kind: str = Field(..., description="Type of work the job runs")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+    created_at: str = Field(..., description="Creation timestamp")
+    finished_at: Optional[str] = Field(None, description="Completion timestamp")
+    result: Optional[Dict[str, Any]] = Field(None, description="Result of the job once finished")
\ No newline at end of file
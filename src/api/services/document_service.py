@@ -1,24 +1,70 @@
+import hashlib
 import os
+import threading
 import time
 import uuid
+from functools import lru_cache
+import aiofiles
+import aiofiles.os
 from src.api.schemas import DocumentMetadata, DocumentsResponse
 from src.config import settings
 
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds settings.MAX_UPLOAD_BYTES."""
+
+
+@lru_cache(maxsize=1024)
+def _format_ctime(timestamp: int) -> str:
+    return time.ctime(timestamp)
+
+
+def _document_id(name: str, file_stat: os.stat_result) -> str:
+    """Stable document ID derived from the file name, size and modification time."""
+    key = f"{name}:{file_stat.st_size}:{file_stat.st_mtime_ns}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
 class DocumentService:
+    # Last listing, keyed on the directory's st_mtime_ns (adding, removing or renaming files bumps it)
+    _listing_cache = None
+    _listing_lock = threading.Lock()
+
     def list_documents(self) -> DocumentsResponse:
+        try:
+            dir_mtime_ns = os.stat(settings.DOCUMENTS_DIR).st_mtime_ns
+        except FileNotFoundError:
+            return DocumentsResponse(documents=[], count=0)
+        with DocumentService._listing_lock:
+            cached = DocumentService._listing_cache
+            if cached is not None and cached[0] == dir_mtime_ns:
+                return cached[1]
+            listing = self._scan_documents()
+            DocumentService._listing_cache = (dir_mtime_ns, listing)
+            return listing
+
+    def _scan_documents(self) -> DocumentsResponse:
         document_list = []
-        if os.path.exists(settings.DOCUMENTS_DIR):
-            for filename in os.listdir(settings.DOCUMENTS_DIR):
-                if filename.startswith('.'):
-                    continue
-                file_path = os.path.join(settings.DOCUMENTS_DIR, filename)
-                if os.path.isfile(file_path):
-                    file_stat = os.stat(file_path)
+        try:
+            entries = os.scandir(settings.DOCUMENTS_DIR)
+        except FileNotFoundError:
+            entries = None
+        if entries is not None:
+            # DirEntry caches the file type from the directory read, so only stat() hits the disk
+            with entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    file_stat = entry.stat()
                     document_list.append(DocumentMetadata(
-                        id=str(uuid.uuid4()),
-                        filename=filename,
+                        id=_document_id(entry.name, file_stat),
+                        filename=entry.name,
                         size=file_stat.st_size,
-                        created_at=time.ctime(file_stat.st_ctime)
+                        created_at=_format_ctime(int(file_stat.st_ctime))
                     ))
         return DocumentsResponse(documents=document_list, count=len(document_list))
 
@@ -29,15 +75,31 @@ class DocumentService:
             raise Exception(f"Unsupported file type: .{ext}. Only PDF, DOC, DOCX, and TXT files are allowed.")
         os.makedirs(settings.DOCUMENTS_DIR, exist_ok=True)
         file_path = os.path.join(settings.DOCUMENTS_DIR, file.filename)
+        # Stream into a hidden temporary file so loaders never see a partially written document;
+        # the random suffix keeps concurrent uploads of the same name from writing into one file
+        tmp_path = os.path.join(settings.DOCUMENTS_DIR, f".{file.filename}.{uuid.uuid4().hex}.part")
+        size = 0
         try:
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    # MaxBodySizeMiddleware limits the whole request; this also bounds the file itself
+                    if size > settings.MAX_UPLOAD_BYTES:
+                        raise UploadTooLargeError(
+                            f"File exceeds the maximum upload size of {settings.MAX_UPLOAD_BYTES} bytes"
+                        )
+                    await f.write(chunk)
+            await aiofiles.os.replace(tmp_path, file_path)
+        except UploadTooLargeError:
+            await aiofiles.os.remove(tmp_path)
+            raise
         except Exception as e:
+            if await aiofiles.os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
             raise Exception(f"Failed to upload file: {str(e)}")
         return {
             "filename": file.filename,
-            "size": len(content),
+            "size": size,
             "description": description,
             "status": "uploaded"
         } 
\ No newline at end of file
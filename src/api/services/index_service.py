@@ -1,28 +1,138 @@
-from src.models.engine import LLMEngine
-from src.utils.document_loader import load_documents, split_documents_into_nodes
+import logging
+import os
+from src.config import settings
+from src.models.engine import LLMEngine, get_engine
+from src.utils.document_loader import assign_content_ids, hash_file, load_documents_by_file, split_documents_into_nodes
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
 
 class IndexService:
     def __init__(self, engine: LLMEngine = None):
-        self.engine = engine or LLMEngine()
+        self.engine = engine or get_engine()
+
+    def warm_index(self):
+        if not (self.engine.index or self.engine.load_index()):
+            # Workers start together: the first to take the lock builds the index, the rest load it
+            with file_lock(settings.INDEX_LOCK_PATH):
+                if not self.engine.load_index():
+                    documents_by_file = load_documents_by_file()
+                    if not documents_by_file:
+                        logger.info("No documents found, index will be built on the next rebuild.")
+                        return False
+                    if self._rebuild_full(documents_by_file)[1] != 200:
+                        return False
+        # One throwaway query pages in Chroma's HNSW files and runs the embedding model once
+        try:
+            self.engine.index.as_retriever(similarity_top_k=1).retrieve("warmup")
+        except Exception as e:
+            logger.warning("Index warmup query failed: %s", e)
+        return True
 
     def rebuild_index(self):
-        self.engine.clear_index()
-        documents = load_documents()
-        if not documents:
+        # Shares the startup build's lock, so a rebuild never interleaves with another worker's warmup
+        with file_lock(settings.INDEX_LOCK_PATH):
+            return self._rebuild_index()
+
+    def _rebuild_index(self):
+        documents_by_file = load_documents_by_file()
+        if not documents_by_file:
+            self.engine.clear_index()
             return {"status": "error", "message": "No documents found for indexing"}, 404
-        nodes = split_documents_into_nodes(documents)
+        manifest = self.engine.load_manifest()
+        if manifest and (self.engine.index or self.engine.load_index()):
+            return self._update_index(documents_by_file, manifest)
+        return self._rebuild_full(documents_by_file)
+
+    def _rebuild_full(self, documents_by_file):
+        self.engine.clear_index()
+        nodes, node_ids = self._split_by_file(documents_by_file)
         if self.engine.create_index(nodes):
+            self.engine.save_manifest({
+                path: self._manifest_entry(path, hash_file(path), node_ids[path])
+                for path in documents_by_file
+            })
+            document_count = sum(len(docs) for docs in documents_by_file.values())
             return {
                 "status": "success",
-                "message": f"Index rebuilt with {len(documents)} documents",
-                "document_count": len(documents),
+                "message": f"Index rebuilt with {document_count} documents",
+                "document_count": document_count,
                 "node_count": len(nodes)
             }, 200
         else:
             return {"status": "error", "message": "Failed to rebuild index"}, 500
 
+    def _update_index(self, documents_by_file, manifest):
+        # Only files whose contents changed since the last build are re-embedded
+        new_manifest = {}
+        changed_files = {}
+        hashes = {}
+        for path, docs in documents_by_file.items():
+            entry = manifest.get(path)
+            file_stat = os.stat(path)
+            if entry and entry["mtime_ns"] == file_stat.st_mtime_ns and entry["size"] == file_stat.st_size:
+                new_manifest[path] = entry
+                continue
+            content_hash = hash_file(path)
+            if entry and entry["hash"] == content_hash:
+                new_manifest[path] = self._manifest_entry(path, content_hash, entry["node_ids"])
+                continue
+            changed_files[path] = docs
+            hashes[path] = content_hash
+
+        removed_count = sum(1 for path in manifest if path not in documents_by_file)
+        nodes, node_ids = self._split_by_file(changed_files) if changed_files else ([], {})
+        # Chunks that survive an edit keep their content ID, so they are neither deleted nor re-embedded
+        kept_node_ids = {node_id for entry in new_manifest.values() for node_id in entry["node_ids"]}
+        kept_node_ids.update(node.node_id for node in nodes)
+        removed_node_ids = list({
+            node_id
+            for path, entry in manifest.items() if path not in new_manifest
+            for node_id in entry["node_ids"]
+        } - kept_node_ids)
+
+        if nodes or removed_node_ids:
+            if self.engine.update_index(nodes, removed_node_ids) is None:
+                return {"status": "error", "message": "Failed to update index"}, 500
+        for path in changed_files:
+            new_manifest[path] = self._manifest_entry(path, hashes[path], node_ids[path])
+        self.engine.save_manifest(new_manifest)
+
+        document_count = sum(len(docs) for docs in documents_by_file.values())
+        return {
+            "status": "success",
+            "message": f"Index updated: {len(changed_files)} new or modified and {removed_count} removed files",
+            "document_count": document_count,
+            "node_count": sum(len(entry["node_ids"]) for entry in new_manifest.values())
+        }, 200
+
+    @staticmethod
+    def _split_by_file(documents_by_file):
+        path_by_doc_id = {doc.doc_id: path for path, docs in documents_by_file.items() for doc in docs}
+        nodes = assign_content_ids(
+            split_documents_into_nodes([doc for docs in documents_by_file.values() for doc in docs])
+        )
+        node_ids = {path: [] for path in documents_by_file}
+        for node in nodes:
+            path = path_by_doc_id.get(node.ref_doc_id)
+            if path is not None:
+                node_ids[path].append(node.node_id)
+        return nodes, node_ids
+
+    @staticmethod
+    def _manifest_entry(path, content_hash, node_ids):
+        file_stat = os.stat(path)
+        return {
+            "mtime_ns": file_stat.st_mtime_ns,
+            "size": file_stat.st_size,
+            "hash": content_hash,
+            "node_ids": node_ids
+        }
+
     def clear_index(self):
-        if self.engine.clear_index():
+        with file_lock(settings.INDEX_LOCK_PATH):
+            cleared = self.engine.clear_index()
+        if cleared:
             return {"status": "success", "message": "Index cleared successfully"}, 200
         else:
-            return {"status": "error", "message": "No index found or error clearing index"}, 404 
\ No newline at end of file
+            return {"status": "error", "message": "No index found or error clearing index"}, 404
\ No newline at end of file
@@ -0,0 +1,63 @@
+import logging
+import os
+import time
+import uuid
+import orjson
+from src.config import settings
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class JobService:
+    def create_job(self, kind):
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "created_at": time.ctime(),
+            "finished_at": None,
+            "result": None
+        }
+        self._save_job(job)
+        return job
+
+    def get_job(self, job_id):
+        # Job IDs are hex strings, so anything else cannot name a job file
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._job_path(job_id), "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def run_job(self, job_id, func):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        # Jobs of the same kind run one at a time across all workers, e.g. two index rebuilds never interleave
+        with file_lock(os.path.join(settings.JOBS_DIR, f"{job['kind']}.lock")):
+            job["status"] = "running"
+            self._save_job(job)
+            try:
+                result, status_code = func()
+                job["status"] = "completed" if status_code < 400 else "failed"
+                job["result"] = result
+            except Exception as e:
+                logger.exception("Job %s failed", job_id)
+                job["status"] = "failed"
+                job["result"] = {"status": "error", "message": str(e)}
+            job["finished_at"] = time.ctime()
+            self._save_job(job)
+
+    def _job_path(self, job_id):
+        return os.path.join(settings.JOBS_DIR, f"{job_id}.json")
+
+    def _save_job(self, job):
+        # Written atomically, since any worker may read the status while the job runs
+        path = self._job_path(job["id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(job))
+        os.replace(tmp_path, path)
\ No newline at end of file
@@ -1,46 +1,134 @@
-from src.models.engine import LLMEngine
-from src.utils.parser import parse_questions_from_text
-from src.utils.document_loader import load_documents, split_documents_into_nodes
-from src.api.schemas import Question, QuestionResponse
-import uuid
+from src.models.engine import LLMEngine, get_engine
+from src.models.question_cache import QuestionCache
+from src.utils.parser import iter_questions_from_stream
+from src.api.schemas import Option, Question, QuestionResponse
+from src.config import settings
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_question_cache = QuestionCache(
+    max_size=settings.QUESTION_CACHE_SIZE,
+    similarity_threshold=settings.QUESTION_CACHE_SIMILARITY
+)
 
 class QuestionGenerationService:
     def __init__(self, engine: LLMEngine = None):
-        self.engine = engine or LLMEngine()
+        self.engine = engine or get_engine()
 
-    def generate_questions(self, num_questions: int) -> QuestionResponse:
-        documents = load_documents()
-        if not documents:
-            return None
-        if not self.engine.index:
-            self.engine.load_index()
-        if not self.engine.index:
-            nodes = split_documents_into_nodes(documents)
-            self.engine.create_index(nodes)
-        raw_questions = self.engine.generate_questions(
-            num_questions=num_questions,
-            similarity_top_k=10
-        )
+    async def generate_questions(self, num_questions: int) -> QuestionResponse:
+        shards = self._split_shards(num_questions)
+        # Each shard prompts on different retrieved text, so shards do not repeat each other's questions
+        contexts = await run_in_threadpool(self._build_contexts, len(shards))
         # None check ekle
-        if raw_questions is None:
-            print("ERROR: LLM returned None for question generation")
-            return None
-        if not isinstance(raw_questions, str):
-            print(f"ERROR: LLM returned non-string type: {type(raw_questions)}")
+        if contexts is None:
             return None
-        parsed_questions = parse_questions_from_text(raw_questions, num_questions)
+        contexts = contexts or [""]
+        context = "\n\n".join(contexts)
+        cache_key = QuestionCache.make_key(context, num_questions)
+        embedding = None
+        if _question_cache.enabled:
+            # Only compared with numpy in the cache, so skip the list-of-floats conversion
+            embedding = await run_in_threadpool(self.engine.embed_model.embed_array, context)
+            cached = _question_cache.get(cache_key, embedding)
+            if cached is not None:
+                logger.info("Returning cached questions for a matching context")
+                return cached
+        results = await asyncio.gather(*(
+            run_in_threadpool(self._generate_shard, contexts[i % len(contexts)], shard)
+            for i, shard in enumerate(shards)
+        ))
         questions = []
-        for q in parsed_questions:
-            options = []
-            for opt in q['options']:
-                label = opt[0]
-                text = opt[3:].strip()
-                options.append({"label": label, "text": text})
-            questions.append(Question(
-                id=str(uuid.uuid4()),
+        seen = set()
+        for shard_questions in results:
+            for question in shard_questions:
+                if question.question not in seen:
+                    seen.add(question.question)
+                    questions.append(question)
+        # Questions are already model_construct-ed, so skip validating the whole list again
+        response = QuestionResponse.model_construct(questions=questions, count=len(questions))
+        if questions:
+            _question_cache.put(cache_key, embedding, response)
+        return response
+
+    async def stream_questions(self, num_questions: int) -> Optional[AsyncIterator[Question]]:
+        """
+        Start generating questions and return an iterator over them, or None without context.
+        
+        Shards are generated in parallel like generate_questions, but each question is
+        yielded as soon as its block is parsed instead of after all shards finish.
+        Streamed questions bypass the question cache.
+        """
+        shards = self._split_shards(num_questions)
+        contexts = await run_in_threadpool(self._build_contexts, len(shards))
+        if contexts is None:
+            return None
+        contexts = contexts or [""]
+        return self._stream_shards([(contexts[i % len(contexts)], shard) for i, shard in enumerate(shards)])
+
+    async def _stream_shards(self, plan: List[Tuple[str, int]]) -> AsyncIterator[Question]:
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce(context: str, num_questions: int):
+            try:
+                chunks = self.engine.generate_from_context(context, num_questions=num_questions, stream=True)
+                for question in self.iter_questions(chunks, num_questions):
+                    # The client went away; leaving the loop closes the LLM stream
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, question)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producers = [asyncio.ensure_future(run_in_threadpool(produce, *shard)) for shard in plan]
+        seen = set()
+        try:
+            # Each producer ends its output with one None
+            for _ in producers:
+                while (question := await queue.get()) is not None:
+                    if question.question not in seen:
+                        seen.add(question.question)
+                        yield question
+        finally:
+            stop.set()
+        await asyncio.gather(*producers)
+
+    @staticmethod
+    def _split_shards(num_questions: int) -> List[int]:
+        shard_size = max(1, settings.QUESTION_SHARD_SIZE)
+        return [min(shard_size, num_questions - i) for i in range(0, num_questions, shard_size)]
+
+    def _build_contexts(self, max_contexts: int) -> Optional[List[str]]:
+        contexts = self.engine.build_contexts(similarity_top_k=10, max_contexts=max_contexts)
+        if contexts is None:
+            logger.error("No context available for question generation")
+        return contexts
+
+    def _generate_shard(self, context: str, num_questions: int) -> List[Question]:
+        chunks = self.engine.generate_from_context(context, num_questions=num_questions, stream=True)
+        return list(self.iter_questions(chunks, num_questions))
+
+    def iter_questions(self, chunks: Iterable[str], num_questions: int) -> Iterator[Question]:
+        """Yield each question as soon as its block is complete in the streamed LLM output."""
+        for q in iter_questions_from_stream(chunks, num_questions):
+            # Parser output is already normalised to "X) text", so skip Pydantic validation
+            options = [Option.model_construct(label=opt[0], text=opt[3:].strip()) for opt in q['options']]
+            # Identical questions map to identical IDs across requests
+            question_id = hashlib.blake2b(
+                "|".join([q['question']] + [opt.text for opt in options]).encode("utf-8"),
+                digest_size=8
+            ).hexdigest()
+            yield Question.model_construct(
+                id=question_id,
                 question=q['question'],
                 options=options,
                 correct_answer=q['correct_answer'],
                 explanation=q['explanation']
-            ))
-        return QuestionResponse(questions=questions, count=len(questions)) 
\ No newline at end of file
+            )
\ No newline at end of file
@@ -14,29 +14,80 @@ DOCUMENTS_DIR = os.path.join(BASE_DIR, "documents")
 STORAGE_DIR = os.path.join(BASE_DIR, "storage")
 
 # Model settings
-MODEL_NAME = os.getenv("MODEL_NAME", "mistral:7b-instruct")
+# Quantization is selected through the model tag, e.g. "-q4_K_M" for speed or "-q8_0" for accuracy
+MODEL_NAME = os.getenv("MODEL_NAME", "mistral:7b-instruct-q4_K_M")
 MODEL_TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "60.0"))
 
+# Question generation settings
+# Requests are split into prompts of at most this many questions, sent to Ollama in parallel
+QUESTION_SHARD_SIZE = int(os.getenv("QUESTION_SHARD_SIZE", "5"))
+# Responses for identical or near-identical contexts are reused (0, the default, disables the cache).
+# The retrieval query is fixed, so with the cache on an unchanged index keeps returning the same questions
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "0"))
+QUESTION_CACHE_SIMILARITY = float(os.getenv("QUESTION_CACHE_SIMILARITY", "0.97"))
+# Token budget for the retrieved chunks packed into each prompt
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "150"))
+
 # Ollama settings
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "localhost")
 OLLAMA_PORT = int(os.getenv("OLLAMA_PORT", "11434"))
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", f"http://{OLLAMA_HOST}:{OLLAMA_PORT}")
+# How long Ollama keeps the model loaded after a request (Ollama's own default is 5m)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "1h")
 
 # Vector DB settings
 PERSIST_DIR = os.getenv("PERSIST_DIR", os.path.join(STORAGE_DIR, "vectordb"))
+# Optional Chroma server; when CHROMA_HOST is set the vector store runs out of process instead of in PERSIST_DIR
+CHROMA_HOST = os.getenv("CHROMA_HOST", "")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
+# Status files of background jobs such as index rebuilds (shared by all workers)
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(STORAGE_DIR, "jobs"))
+# Lock file that serializes index builds across worker processes
+INDEX_LOCK_PATH = os.getenv("INDEX_LOCK_PATH", os.path.join(STORAGE_DIR, ".index.lock"))
+# Indexed files with their content hashes and node IDs, used to re-embed only changed documents
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(STORAGE_DIR, "index_manifest.json"))
 
 # Document processing
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "512"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
 MAX_DOCUMENT_SIZE = int(os.getenv("MAX_DOCUMENT_SIZE", "20000"))
+# Largest accepted upload in bytes; bigger requests are rejected with 413
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+# Worker processes for parsing and chunking documents (1 disables multiprocessing)
+LOAD_WORKERS = int(os.getenv("LOAD_WORKERS", str(max(1, (os.cpu_count() or 1) - 1))))
+DOC_CACHE_PATH = os.getenv("DOC_CACHE_PATH", os.path.join(STORAGE_DIR, ".doc_cache.pkl"))
 EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "storage/embedding_cache/bge-small-en-v1.5-sbert")
+# "torch" runs the model with PyTorch, "onnx" with ONNX Runtime (export with download_embedding_model.py --onnx)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# ONNX file to load relative to the model path, e.g. "onnx/model_qint8_avx512_vnni.onnx" (empty for the default export)
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+# torch.compile the PyTorch embedding model at startup (slow first start, faster encodes afterwards)
+EMBEDDING_COMPILE = os.getenv("EMBEDDING_COMPILE", "false").lower() in ("1", "true", "yes")
+# Run the PyTorch embedding model in fp16 when it is on a CUDA GPU
+EMBEDDING_HALF_PRECISION = os.getenv("EMBEDDING_HALF_PRECISION", "false").lower() in ("1", "true", "yes")
+# Texts encoded per embedding call while indexing
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Milliseconds to collect concurrent single-text embeddings into one batch (0 encodes each call directly)
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "0"))
+# Single-text embeddings kept in memory, e.g. the fixed retrieval query (0 disables the cache)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
 
 # Server settings
 HOST = os.getenv("HOST", "localhost")
 PORT = int(os.getenv("PORT", "8000"))
-WORKERS = int(os.getenv("WORKERS", "4"))
+# More than one worker needs CHROMA_HOST, since the embedded Chroma store is single-process
+WORKERS = int(os.getenv("WORKERS", "1"))
+# Debug mode runs a single auto-reloading worker; otherwise WORKERS processes are started
+DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+# Maximum concurrent connections per worker before returning 503 (unset means unlimited)
+LIMIT_CONCURRENCY = int(os.getenv("LIMIT_CONCURRENCY", "0")) or None
+# Level of the application loggers (DEBUG also logs retrieved chunks and prompt context)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Comma-separated origins allowed by CORS; credentials are only allowed with explicit origins
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()]
 
 # Ensure directories exist
 os.makedirs(DOCUMENTS_DIR, exist_ok=True)
 os.makedirs(STORAGE_DIR, exist_ok=True)
-os.makedirs(PERSIST_DIR, exist_ok=True) 
\ No newline at end of file
+os.makedirs(PERSIST_DIR, exist_ok=True)
+os.makedirs(JOBS_DIR, exist_ok=True) 
\ No newline at end of file
@@ -1,26 +1,53 @@
 """
 Main application entry point.
 """
-import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi_offline import FastAPIOffline
+from starlette.concurrency import run_in_threadpool
 
 from src.api.endpoints import router
+from src.api.middleware import MaxBodySizeMiddleware
+from src.api.services.index_service import IndexService
+from src.models.engine import get_engine
+from src.utils.logging_config import configure_logging
 from src.config import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the LLM and the vector index before serving requests."""
+    log_listener = configure_logging()
+    engine = get_engine()
+    await asyncio.gather(
+        run_in_threadpool(engine.preload_model),
+        run_in_threadpool(IndexService(engine).warm_index)
+    )
+    yield
+    log_listener.stop()
+
+
 # Create FastAPI application with offline docs
 app = FastAPIOffline(
     title="Document-Based Question Generator",
     description="API for generating multiple-choice questions from documents using LLMs",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Reject oversized request bodies before they are spooled; added first so it runs inside CORS and 413s carry CORS headers
+app.add_middleware(MaxBodySizeMiddleware, max_body_size=settings.MAX_UPLOAD_BYTES)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # For production, specify actual origins
-    allow_credentials=True,
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials="*" not in settings.CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
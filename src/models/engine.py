@@ -1,20 +1,37 @@
 """
 Core engine for LLM and vector store functionality.
 """
-from llama_index.core import StorageContext, PromptTemplate
+import logging
+from functools import lru_cache
+
+from llama_index.core import StorageContext
 from llama_index.llms.ollama import Ollama
 from llama_index.core.settings import Settings
 from llama_index.vector_stores.chroma import ChromaVectorStore
 import chromadb
+import httpx
+import orjson
 
 from src.config import settings
 from src.models.index_manager import IndexManager
 from src.models.sentence_transformer_embedding import SentenceTransformerEmbedding
 
 
-# Template for multiple choice question generation
-QUESTION_GEN_TEMPLATE = PromptTemplate(
-    """
+logger = logging.getLogger(__name__)
+
+
+# HNSW index parameters for new Chroma collections; the embeddings are normalized, so cosine
+# ranks like the default L2 while a wider search_ef keeps top-k recall high at small index sizes
+CHROMA_HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 100,
+    "hnsw:M": 16
+}
+
+
+# Template for multiple choice question generation (plain str.format, no LlamaIndex templating)
+QUESTION_GEN_TEMPLATE = """
     Create {num_questions} high-quality multiple-choice question from this text:
 
     {context}
@@ -36,7 +53,6 @@ QUESTION_GEN_TEMPLATE = PromptTemplate(
 
     Create exactly {num_questions} question(s) in this format.
     """
-)
 
 
 class LLMEngine:
@@ -51,18 +67,40 @@ class LLMEngine:
             base_url=settings.OLLAMA_BASE_URL
         )
         
+        # Pooled keep-alive client for direct Ollama API calls, shared by concurrent generations
+        self._http = httpx.Client(
+            base_url=settings.OLLAMA_BASE_URL,
+            timeout=settings.MODEL_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=4)
+        )
+        
         # Set up embedding model
         try:
-            self.embed_model = SentenceTransformerEmbedding(settings.EMBEDDING_MODEL_PATH)
-            print(f"✅ SentenceTransformer embedding model loaded from {settings.EMBEDDING_MODEL_PATH}")
+            self.embed_model = SentenceTransformerEmbedding(
+                settings.EMBEDDING_MODEL_PATH,
+                backend=settings.EMBEDDING_BACKEND,
+                onnx_file=settings.EMBEDDING_ONNX_FILE,
+                embed_batch_size=settings.EMBED_BATCH_SIZE,
+                batch_window_ms=settings.EMBED_BATCH_WINDOW_MS,
+                cache_size=settings.EMBED_CACHE_SIZE,
+                compile_model=settings.EMBEDDING_COMPILE,
+                half_precision=settings.EMBEDDING_HALF_PRECISION
+            )
+            print(f"✅ SentenceTransformer embedding model loaded from {settings.EMBEDDING_MODEL_PATH} ({settings.EMBEDDING_BACKEND})")
             
         except Exception as e:
             print(f"❌ Error loading embedding model: {e}")
             raise
         
-        # Initialize Chroma client
-        self.chroma_client = chromadb.PersistentClient(path=settings.PERSIST_DIR)
-        self.chroma_collection = self.chroma_client.get_or_create_collection("document_collection")
+        # Initialize Chroma client; a separate Chroma server keeps its HNSW and SQLite writes off this process's GIL
+        if settings.CHROMA_HOST:
+            self.chroma_client = chromadb.HttpClient(host=settings.CHROMA_HOST, port=settings.CHROMA_PORT)
+        else:
+            self.chroma_client = chromadb.PersistentClient(path=settings.PERSIST_DIR)
+        self.chroma_collection = self.chroma_client.get_or_create_collection(
+            "document_collection",
+            metadata=CHROMA_HNSW_METADATA
+        )
         
         # Set up vector store
         self.vector_store = ChromaVectorStore(chroma_collection=self.chroma_collection)
@@ -90,6 +128,37 @@ class LLMEngine:
         self.index = self.index_manager.create_index(nodes)
         return self.index
     
+    def update_index(self, nodes, removed_node_ids):
+        """
+        Incrementally update the loaded index.
+        
+        Args:
+            nodes: New document nodes to embed and insert
+            removed_node_ids: IDs of nodes to delete from the vector store
+            
+        Returns:
+            The updated index, or None if no index is loaded
+        """
+        return self.index_manager.update_index(nodes, removed_node_ids)
+    
+    def load_manifest(self):
+        """
+        Load the manifest of indexed files.
+        
+        Returns:
+            Dictionary mapping file paths to their size, mtime, content hash and node IDs
+        """
+        return self.index_manager.load_manifest()
+    
+    def save_manifest(self, manifest):
+        """
+        Persist the manifest of indexed files.
+        
+        Args:
+            manifest: Dictionary returned by load_manifest, updated after indexing
+        """
+        self.index_manager.save_manifest(manifest)
+    
     def persist_index(self):
         """
         Persist the index to disk for later use.
@@ -118,6 +187,27 @@ class LLMEngine:
             self.index = None
         return result
     
+    def preload_model(self):
+        """
+        Ask Ollama to load the model into memory ahead of the first request.
+        
+        Returns:
+            True if the model was loaded, False otherwise
+        """
+        try:
+            # A request without a prompt only loads the model
+            response = self._http.post(
+                "/api/generate",
+                json={"model": settings.MODEL_NAME, "keep_alive": settings.OLLAMA_KEEP_ALIVE}
+            )
+            if response.status_code == 200:
+                print(f"Model {settings.MODEL_NAME} loaded")
+                return True
+            print(f"Failed to preload model {settings.MODEL_NAME}: {response.status_code}")
+        except Exception as e:
+            print(f"Failed to preload model {settings.MODEL_NAME}: {e}")
+        return False
+    
     def _generate_with_llm(self, context, num_questions=5):
         """
         Internal helper to generate questions using LLM.
@@ -130,54 +220,78 @@ class LLMEngine:
             Raw LLM response text with questions
         """
         if not context:
-            print("No content provided for question generation.")
+            logger.warning("No content provided for question generation.")
             return None
         
-        print(f"Generating {num_questions} questions...")
+        return "".join(self._stream_with_llm(context, num_questions))
+    
+    def _stream_with_llm(self, context, num_questions=5):
+        """
+        Internal helper to stream generated questions from the LLM.
+        
+        Args:
+            context: Text content to generate questions from
+            num_questions: Number of questions to generate
+            
+        Yields:
+            Fragments of the raw LLM response text as they are generated
+        """
+        if not context:
+            logger.warning("No content provided for question generation.")
+            return
+        
+        logger.info("Generating %d questions...", num_questions)
+        
+        prompt = QUESTION_GEN_TEMPLATE.format(
+            context=context,
+            num_questions=num_questions
+        )
         
         # Try direct Ollama API first
+        streamed_chars = 0
         try:
-            import requests
-            import json
-            
-            prompt = QUESTION_GEN_TEMPLATE.format(
-                context=context,
-                num_questions=num_questions
-            )
-            
-            print(f"Using direct Ollama API...")
-            response = requests.post(
-                f"{settings.OLLAMA_BASE_URL}/api/generate",
-                json={
+            logger.debug("Using direct Ollama API...")
+            with self._http.stream(
+                "POST",
+                "/api/generate",
+                content=orjson.dumps({
                     "model": settings.MODEL_NAME,
                     "prompt": prompt,
-                    "stream": False
-                },
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"Direct Ollama API success: {len(result.get('response', ''))} chars")
-                return result.get('response', '')
-            else:
-                print(f"Direct Ollama API failed: {response.status_code}")
+                    "stream": True,
+                    "keep_alive": settings.OLLAMA_KEEP_ALIVE
+                }),
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                if response.status_code == 200:
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        # One JSON object per generated token
+                        chunk = orjson.loads(line)
+                        delta = chunk.get('response', '')
+                        if delta:
+                            streamed_chars += len(delta)
+                            yield delta
+                        if chunk.get('done'):
+                            break
+                    logger.debug("Direct Ollama API success: %d chars", streamed_chars)
+                    return
+                else:
+                    logger.warning("Direct Ollama API failed: %s", response.status_code)
                 
         except Exception as e:
-            print(f"Direct Ollama API error: {e}")
+            # Text already handed to the caller cannot be replayed through the fallback
+            if streamed_chars:
+                raise
+            logger.warning("Direct Ollama API error: %s", e)
         
         # Fallback to LlamaIndex wrapper
-        print(f"Falling back to LlamaIndex wrapper...")
-        response = self.llm.complete(
-            QUESTION_GEN_TEMPLATE.format(
-                context=context,
-                num_questions=num_questions
-            )
-        )
-        
-        return response.text
+        logger.info("Falling back to LlamaIndex wrapper...")
+        for chunk in self.llm.stream_complete(prompt):
+            if chunk.delta:
+                yield chunk.delta
     
-    def generate_questions(self, index=None, num_questions=5, similarity_top_k=1):
+    def generate_questions(self, index=None, num_questions=5, similarity_top_k=1, stream=False):
         """
         Generate multiple-choice questions using RAG approach.
         
@@ -185,12 +299,50 @@ class LLMEngine:
             index: Vector index to use (uses self.index if None)
             num_questions: Number of questions to generate
             similarity_top_k: Number of top relevant chunks to use
+            stream: Return an iterator over response fragments instead of the full text
             
         Returns:
-            Raw LLM response text with questions
+            Raw LLM response text with questions, or an iterator of text fragments if streaming
+        """
+        context = self.build_context(index=index, similarity_top_k=similarity_top_k)
+        if context is None:
+            return None
+        
+        return self.generate_from_context(context, num_questions=num_questions, stream=stream)
+    
+    def build_context(self, index=None, similarity_top_k=1):
+        """
+        Retrieve the most relevant chunks and pack them into a prompt context.
+        
+        Args:
+            index: Vector index to use (uses self.index if None)
+            similarity_top_k: Number of top relevant chunks to use
+            
+        Returns:
+            Context text for question generation, or None if no index is available
+        """
+        contexts = self.build_contexts(index=index, similarity_top_k=similarity_top_k, max_contexts=1)
+        if contexts is None:
+            return None
+        return contexts[0] if contexts else ""
+    
+    def build_contexts(self, index=None, similarity_top_k=1, max_contexts=1):
+        """
+        Retrieve the most relevant chunks and pack them into several prompt contexts.
+        
+        Chunks are taken in relevance order; each context is filled up to the token
+        budget before the next one is started, so every context covers different text.
+        
+        Args:
+            index: Vector index to use (uses self.index if None)
+            similarity_top_k: Number of top relevant chunks to use
+            max_contexts: Maximum number of contexts to build
+            
+        Returns:
+            List of context texts, most relevant first, or None if no index is available
         """
         if not index and not self.index:
-            print("No index available. Please create an index first.")
+            logger.warning("No index available. Please create an index first.")
             return None
         
         active_index = index if index else self.index
@@ -200,55 +352,99 @@ class LLMEngine:
         retriever = active_index.as_retriever(similarity_top_k=similarity_top_k)
         nodes = retriever.retrieve("Summarize the main topics and key information in these documents")
         
-        print(f"Retrieved {len(nodes)} nodes from index")
-        
-        # Debug: Check node content
-        for i, node in enumerate(nodes):
-            # Always get text, fallback to get_content
-            content = getattr(node.node, 'text', None) or node.node.get_content()
-            print(f"Node {i}: {len(content)} chars - {content[:100]}...")
-        
-        # Use minimal context for faster processing
-        estimated_max_chars = 800  # Increased for better quality
-        prompt_overhead = 200  # Approximate chars for prompt template
+        logger.debug("Retrieved %d nodes from index", len(nodes))
+        if not nodes:
+            return []
         
-        # Process nodes to fit within context window
-        selected_nodes = []
-        current_length = 0
+        # Budget each context in tokens of the LlamaIndex tokenizer rather than characters
+        max_context_tokens = settings.CONTEXT_MAX_TOKENS
         
         # First, sort nodes by relevance score (if available)
-        if hasattr(nodes[0], 'score'):
-            nodes = sorted(nodes, key=lambda n: n.score if hasattr(n, 'score') else 0, reverse=True)
+        if getattr(nodes[0], 'score', None) is not None:
+            nodes.sort(key=lambda n: n.score or 0.0, reverse=True)
         
-        # Then select nodes up to max length
-        for node in nodes:
-            content = getattr(node.node, 'text', None) or node.node.get_content()
-            # If this single node exceeds our limit, we might need to truncate it
-            if len(content) > estimated_max_chars - prompt_overhead and len(selected_nodes) == 0:
-                print(f"Single node too large, truncating to fit context window")
-                selected_nodes.append(content[:estimated_max_chars - prompt_overhead])
+        tokenizer = Settings.tokenizer
+        
+        # Then pack nodes into contexts up to the token budget, extracting and tokenizing
+        # each node's text only when it is reached
+        contexts = []
+        selected_nodes = []
+        current_tokens = 0
+        used_nodes = 0
+        for i, node in enumerate(nodes):
+            if current_tokens >= max_context_tokens and len(contexts) + 1 == max_contexts:
+                # The last context is already full, so no later node can be used
                 break
             
-            if current_length + len(content) <= estimated_max_chars - prompt_overhead:
-                selected_nodes.append(content)
-                current_length += len(content)
+            # Always get text, fallback to get_content
+            content = getattr(node.node, 'text', None) or node.node.get_content()
+            tokens = len(tokenizer(content))
+            
+            # Debug: Check node content
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Node %d: %d tokens - %s...", i, tokens, content[:100])
+            
+            if selected_nodes and current_tokens + tokens > max_context_tokens:
+                # This context is full; start the next one with the current node
+                contexts.append("\n\n".join(selected_nodes))
+                selected_nodes = []
+                current_tokens = 0
+                if len(contexts) == max_contexts:
+                    break
+            
+            # If this single node exceeds our limit, truncate it to fill a context on its own
+            if tokens > max_context_tokens:
+                logger.debug("Single node too large, truncating to fit context window")
+                selected_nodes.append(content[:len(content) * max_context_tokens // tokens])
+                current_tokens = max_context_tokens
             else:
-                # We've reached our limit
-                break
+                selected_nodes.append(content)
+                current_tokens += tokens
+            used_nodes += 1
+        
+        if selected_nodes and len(contexts) < max_contexts:
+            contexts.append("\n\n".join(selected_nodes))
         
-        print(f"Using {len(selected_nodes)} of {len(nodes)} relevant chunks (total {current_length} chars)")
+        logger.debug("Packed %d of %d relevant chunks into %d contexts", used_nodes, len(nodes), len(contexts))
         
-        # Combine the selected chunks into context for question generation
-        context = "\n\n".join(selected_nodes)
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, context in enumerate(contexts):
+                logger.debug("Context %d: %d chars - %s...", i, len(context), context[:200])
         
-        print(f"Final context length: {len(context)} chars")
-        print(f"Context preview: {context[:200]}...")
+        return contexts
+    
+    def generate_from_context(self, context, num_questions=5, stream=False):
+        """
+        Generate multiple-choice questions from an already built context.
         
+        Args:
+            context: Context text returned by build_context
+            num_questions: Number of questions to generate
+            stream: Return an iterator over response fragments instead of the full text
+            
+        Returns:
+            Raw LLM response text with questions, or an iterator of text fragments if streaming
+        """
         if not context.strip():
-            print("ERROR: Empty context! Cannot generate questions.")
+            logger.error("Empty context! Cannot generate questions.")
+            if stream:
+                return iter(())
             return "Error: No content available for question generation."
         
-        print(f"Generating {num_questions} questions from selected chunks...")
+        logger.info("Generating %d questions from selected chunks...", num_questions)
         
         # Call the LLM to generate questions
-        return self._generate_with_llm(context, num_questions) 
\ No newline at end of file
+        if stream:
+            return self._stream_with_llm(context, num_questions)
+        return self._generate_with_llm(context, num_questions)
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> LLMEngine:
+    """
+    Get the process-wide LLM engine, creating it on first use.
+    
+    Returns:
+        Shared LLMEngine instance
+    """
+    return LLMEngine()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import orjson
 from llama_index.core import VectorStoreIndex, StorageContext
 from src.config import settings
 
@@ -25,6 +26,42 @@ class IndexManager:
         print("Vector index created and persisted.")
         return self.index
 
+    def update_index(self, nodes, removed_node_ids):
+        if self.index is None:
+            return None
+        if removed_node_ids:
+            print(f"Removing {len(removed_node_ids)} stale nodes from the vector store...")
+            self.chroma_collection.delete(ids=removed_node_ids)
+        if nodes:
+            # Node IDs are content hashes, so nodes already stored in Chroma need no new embedding
+            existing_ids = set(self.chroma_collection.get(ids=[node.node_id for node in nodes], include=[])["ids"])
+            nodes = [node for node in nodes if node.node_id not in existing_ids]
+            if existing_ids:
+                print(f"Reusing {len(existing_ids)} unchanged nodes from the vector store.")
+        if nodes:
+            print(f"Embedding and inserting {len(nodes)} new nodes...")
+            self.index.insert_nodes(nodes)
+        self.persist_index()
+        return self.index
+
+    def load_manifest(self):
+        if os.path.exists(settings.INDEX_MANIFEST_PATH):
+            try:
+                with open(settings.INDEX_MANIFEST_PATH, "rb") as f:
+                    return orjson.loads(f.read())
+            except Exception as e:
+                print(f"Ignoring unreadable index manifest: {e}")
+        return {}
+
+    def save_manifest(self, manifest):
+        tmp_path = f"{settings.INDEX_MANIFEST_PATH}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(manifest))
+            os.replace(tmp_path, settings.INDEX_MANIFEST_PATH)
+        except Exception as e:
+            print(f"Failed to persist index manifest: {e}")
+
     def persist_index(self):
         if self.index and self.storage_context:
             index_persist_dir = os.path.join(settings.PERSIST_DIR, "index")
@@ -71,6 +108,8 @@ class IndexManager:
                 if self.chroma_collection:
                     self.chroma_collection.delete(where={})
                     print("ChromaDB collection cleared.")
+                if os.path.exists(settings.INDEX_MANIFEST_PATH):
+                    os.remove(settings.INDEX_MANIFEST_PATH)
                 self.index = None
                 self.engine.index = None
                 return True
@@ -0,0 +1,103 @@
+"""
+Semantic cache for generated questions.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class QuestionCache:
+    """LRU cache of generated questions keyed on the prompt context, with near-duplicate lookup."""
+
+    def __init__(self, max_size=32, similarity_threshold=0.97):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size: Maximum number of cached responses (0 disables the cache)
+            similarity_threshold: Minimum cosine similarity for a near-duplicate hit
+        """
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(context, num_questions):
+        """
+        Build the exact-match key for a generation request.
+
+        Args:
+            context: Context text the questions are generated from
+            num_questions: Number of requested questions
+
+        Returns:
+            Tuple of (context hash, num_questions)
+        """
+        return hashlib.sha256(context.encode("utf-8")).hexdigest(), num_questions
+
+    def get(self, key, embedding=None):
+        """
+        Look up a cached response by exact key, then by embedding similarity.
+
+        Args:
+            key: Key returned by make_key
+            embedding: Embedding of the context, used for near-duplicate lookup
+
+        Returns:
+            Cached value or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][1]
+
+            if embedding is None:
+                return None
+
+            # Only requests for the same number of questions are interchangeable
+            candidates = [k for k in self._entries if k[1] == key[1]]
+            if not candidates:
+                return None
+
+            matrix = np.stack([self._entries[k][0] for k in candidates])
+            scores = matrix @ self._normalize(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+
+            self._entries.move_to_end(candidates[best])
+            return self._entries[candidates[best]][1]
+
+    def put(self, key, embedding, value):
+        """
+        Store a response, evicting the least recently used entry when full.
+
+        Args:
+            key: Key returned by make_key
+            embedding: Embedding of the context
+            value: Response to cache
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (self._normalize(embedding), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,13 +1,118 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from llama_index.core.embeddings import BaseEmbedding
 
+
+def _compile_model(model):
+    # TorchDynamo/Inductor-compile the transformer forward; dynamic shapes avoid recompiling per sequence length
+    import torch
+    transformer = model[0].auto_model
+    transformer.forward = torch.compile(transformer.forward, mode="reduce-overhead", dynamic=True)
+    # Compilation happens on the first call, so pay for it at startup rather than on a request
+    model.encode(["warmup"], show_progress_bar=False)
+    return model
+
+
+def _load_model(model_path, backend, onnx_file=None, compile_model=False, half_precision=False):
+    if backend == "onnx":
+        # ONNX Runtime inference with full graph optimizations, on the GPU when onnxruntime-gpu provides CUDA
+        import onnxruntime as ort
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if "CUDAExecutionProvider" in ort.get_available_providers():
+            provider = "CUDAExecutionProvider"
+        else:
+            provider = "CPUExecutionProvider"
+            session_options.intra_op_num_threads = os.cpu_count()
+        model_kwargs = {"provider": provider, "session_options": session_options}
+        if onnx_file:
+            # e.g. an int8 dynamically quantized export, or model_O4.onnx (fp16) for CUDA
+            model_kwargs["file_name"] = onnx_file
+        return SentenceTransformer(model_path, backend="onnx", model_kwargs=model_kwargs)
+    # SentenceTransformer picks CUDA (or MPS) on its own when available
+    model = SentenceTransformer(model_path)
+    if half_precision and model.device.type == "cuda":
+        # fp16 halves weight memory traffic on the GPU; CPU kernels stay in fp32
+        model.half()
+    return _compile_model(model) if compile_model else model
+
+
+class _EncodeBatcher:
+    """Coalesce single-text encode calls arriving from concurrent threads into one batched encode."""
+
+    def __init__(self, model, batch_size, window_seconds):
+        self._model = model
+        self._batch_size = batch_size
+        self._window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def encode(self, text):
+        future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            is_leader = len(self._pending) == 1
+        if is_leader:
+            # The first caller waits out the window, then encodes everything queued meanwhile
+            time.sleep(self._window_seconds)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            try:
+                vectors = self._model.encode(
+                    [item[0] for item in batch],
+                    batch_size=self._batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+                for (_, pending), vector in zip(batch, vectors):
+                    pending.set_result(vector)
+            except Exception as e:
+                for _, pending in batch:
+                    pending.set_exception(e)
+        return future.result()
+
+
 class SentenceTransformerEmbedding(BaseEmbedding):
-    def __init__(self, model_path):
-        super().__init__()
-        object.__setattr__(self, 'model', SentenceTransformer(model_path))
+    def __init__(self, model_path, backend="torch", onnx_file=None, embed_batch_size=64, batch_window_ms=0, cache_size=2048,
+                 compile_model=False, half_precision=False):
+        # LlamaIndex hands _get_text_embeddings at most embed_batch_size texts per call (default 10)
+        super().__init__(embed_batch_size=embed_batch_size)
+        model = _load_model(model_path, backend, onnx_file, compile_model, half_precision)
+        object.__setattr__(self, 'model', model)
+        # Single-text calls (queries, cache lookups) from concurrent requests share a forward pass
+        batcher = _EncodeBatcher(model, embed_batch_size, batch_window_ms / 1000) if batch_window_ms > 0 else None
+        object.__setattr__(self, '_batcher', batcher)
+        # Repeated single texts (the fixed retrieval query, identical contexts) skip the forward pass;
+        # BaseEmbedding rejects new attributes, so the cached function is attached like the model
+        object.__setattr__(self, '_embed_cached', lru_cache(maxsize=cache_size)(self._encode_single))
+    
+    def _encode_single(self, text: str):
+        if self._batcher is not None:
+            vector = self._batcher.encode(text)
+        else:
+            vector = self.model.encode(text, convert_to_numpy=True)
+        # Cached as a compact float32 buffer, read-only so no caller can alter a shared entry
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        return vector
+    
+    def embed_array(self, text: str):
+        """Embedding of a single text as a read-only float32 array, without building a list of floats."""
+        return self._embed_cached(text)
+    
+    def cache_info(self):
+        """Hit and miss counts of the single-text embedding cache."""
+        return self._embed_cached.cache_info()
     
     def _get_query_embedding(self, query: str):
-        return self.model.encode(query).tolist()
+        # LlamaIndex and Chroma (0.4) require plain lists of floats
+        return self._embed_cached(query).tolist()
     
     async def _aget_query_embedding(self, query: str):
         return self._get_query_embedding(query)
@@ -16,4 +121,9 @@ class SentenceTransformerEmbedding(BaseEmbedding):
         return self._get_query_embedding(text)
     
     def _get_text_embeddings(self, texts: list):
-        return self.model.encode(texts).tolist() 
\ No newline at end of file
+        return self.model.encode(
+            texts,
+            batch_size=self.embed_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).tolist() 
\ No newline at end of file
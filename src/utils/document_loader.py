@@ -1,42 +1,166 @@
 """
 Document loading and processing utilities.
 """
+import hashlib
 import os
-from typing import List, Optional
+import pickle
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
 
 from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.core.ingestion import IngestionPipeline
 from llama_index.core.node_parser import SimpleNodeParser
+from llama_index.core.schema import MetadataMode
 
 from src.config import settings
 
 
-def load_documents(docs_dir: str = settings.DOCUMENTS_DIR) -> List[Document]:
+ALLOWED_EXTENSIONS = {"pdf", "doc", "docx", "txt"}
+
+# Parsed documents per file path, keyed on (st_mtime_ns, st_size) to detect changes
+_doc_cache: Optional[Dict[str, Tuple[Tuple[int, int], List[Document]]]] = None
+_doc_cache_lock = threading.Lock()
+
+
+def _get_doc_cache() -> Dict[str, Tuple[Tuple[int, int], List[Document]]]:
+    """Return the document cache, loading it from disk on first use."""
+    global _doc_cache
+    if _doc_cache is None:
+        _doc_cache = {}
+        if os.path.exists(settings.DOC_CACHE_PATH):
+            try:
+                with open(settings.DOC_CACHE_PATH, "rb") as f:
+                    _doc_cache = pickle.load(f)
+            except Exception as e:
+                print(f"Ignoring unreadable document cache: {e}")
+    return _doc_cache
+
+
+def _save_doc_cache(cache: Dict[str, Tuple[Tuple[int, int], List[Document]]]) -> None:
+    """Persist the document cache so other processes can reuse parsed documents."""
+    # A uniquely named temporary file per writer, so concurrent saves from several workers never share one
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(settings.DOC_CACHE_PATH) or ".", suffix=".tmp", delete=False
+        ) as f:
+            tmp_path = f.name
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, settings.DOC_CACHE_PATH)
+    except Exception as e:
+        print(f"Failed to persist document cache: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def hash_file(path: str) -> str:
     """
-    Load documents from the specified directory.
+    Hash a file's contents.
+    
+    Args:
+        path: Path of the file to hash
+        
+    Returns:
+        Hex BLAKE2b digest of the file contents
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_document_files(docs_dir: str = settings.DOCUMENTS_DIR) -> Dict[str, Tuple[int, int]]:
+    """
+    List the supported documents in a directory.
+    
+    Args:
+        docs_dir: Directory containing documents
+        
+    Returns:
+        Dictionary mapping absolute file paths to (st_mtime_ns, st_size)
+    """
+    file_keys = {}
+    with os.scandir(docs_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            ext = entry.name.rsplit('.', 1)[-1].lower()
+            # Skip unsupported file types
+            if ext not in ALLOWED_EXTENSIONS:
+                print(f"Skipping unsupported file type: {entry.name}")
+                continue
+            stat = entry.stat()
+            file_keys[os.path.abspath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+    return file_keys
+
+
+def load_documents_by_file(docs_dir: str = settings.DOCUMENTS_DIR) -> Dict[str, List[Document]]:
+    """
+    Load documents from the specified directory, grouped by source file.
+    
+    Files are only parsed when they are new or their modification time or size
+    changed since the last call; unchanged files are served from the cache.
     
     Args:
         docs_dir: Directory containing documents to load
         
     Returns:
-        List of loaded documents
+        Dictionary mapping absolute file paths to the documents parsed from them
     """
     if not os.path.exists(docs_dir):
         os.makedirs(docs_dir)
         print(f"Created '{docs_dir}' directory. Please add your documents there.")
-        return []
+        return {}
     
-    allowed_extensions = {"pdf", "doc", "docx", "txt"}
-    documents = SimpleDirectoryReader(docs_dir).load_data()
-    filtered_documents = []
+    file_keys = scan_document_files(docs_dir)
+    
+    with _doc_cache_lock:
+        cache = _get_doc_cache()
+        changed_files = [path for path, key in file_keys.items() if cache.get(path, (None,))[0] != key]
+        removed_files = [
+            path for path in cache
+            if os.path.dirname(path) == os.path.abspath(docs_dir) and path not in file_keys
+        ]
+        
+        if changed_files:
+            print(f"Parsing {len(changed_files)} new or modified documents...")
+            parsed = {path: [] for path in changed_files}
+            paths_by_name = {os.path.basename(path): path for path in changed_files}
+            reader = SimpleDirectoryReader(input_files=changed_files)
+            num_workers = min(settings.LOAD_WORKERS, len(changed_files))
+            loaded = reader.load_data(num_workers=num_workers) if num_workers > 1 else reader.load_data()
+            for doc in loaded:
+                filename = os.path.basename(doc.metadata.get('file_name', ''))
+                if filename in paths_by_name:
+                    parsed[paths_by_name[filename]].append(doc)
+            for path, docs in parsed.items():
+                cache[path] = (file_keys[path], docs)
+        
+        for path in removed_files:
+            del cache[path]
+        
+        if changed_files or removed_files:
+            _save_doc_cache(cache)
+        
+        return {path: cache[path][1] for path in sorted(file_keys) if cache[path][1]}
+
+
+def load_documents(docs_dir: str = settings.DOCUMENTS_DIR) -> List[Document]:
+    """
+    Load documents from the specified directory.
+    
+    Args:
+        docs_dir: Directory containing documents to load
+        
+    Returns:
+        List of loaded documents
+    """
+    filtered_documents = [
+        doc for docs in load_documents_by_file(docs_dir).values() for doc in docs
+    ]
     
-    for doc in documents:
-        filename = os.path.basename(doc.metadata.get('file_name', ''))
-        ext = filename.rsplit('.', 1)[-1].lower()
-        # Skip unsupported file types
-        if ext not in allowed_extensions:
-            print(f"Skipping unsupported file type: {filename}")
-            continue
-        filtered_documents.append(doc)
     if not filtered_documents:
         print(f"No valid documents found in '{docs_dir}' directory.")
         return []
@@ -54,13 +178,31 @@ def get_document_text(documents: List[Document]) -> str:
     Returns:
         Combined document text
     """
-    all_text = "\n\n".join([doc.text for doc in documents])
+    separator = "\n\n"
+    limit = settings.MAX_DOCUMENT_SIZE
+    parts = []
+    total = 0
+    truncated = False
     
-    if len(all_text) > settings.MAX_DOCUMENT_SIZE:
-        print(f"Text too long, using only first {settings.MAX_DOCUMENT_SIZE//1000}K characters.")
-        all_text = all_text[:settings.MAX_DOCUMENT_SIZE]
+    # Stop copying text once the limit is reached instead of joining everything and slicing
+    for doc in documents:
+        separator_length = len(separator) if parts else 0
+        remaining = limit - total - separator_length
+        if remaining <= 0:
+            truncated = True
+            break
+        text = doc.text
+        if len(text) > remaining:
+            parts.append(text[:remaining])
+            truncated = True
+            break
+        parts.append(text)
+        total += separator_length + len(text)
     
-    return all_text
+    if truncated:
+        print(f"Text too long, using only first {limit//1000}K characters.")
+    
+    return separator.join(parts)
 
 
 def split_documents_into_nodes(documents: List[Document]):
@@ -81,7 +223,35 @@ def split_documents_into_nodes(documents: List[Document]):
         chunk_size=settings.CHUNK_SIZE, 
         chunk_overlap=settings.CHUNK_OVERLAP
     )
-    nodes = node_parser.get_nodes_from_documents(documents)
+    num_workers = min(settings.LOAD_WORKERS, len(documents))
+    if num_workers > 1:
+        # Chunking is CPU-bound and independent per document, so fan it out over processes
+        pipeline = IngestionPipeline(transformations=[node_parser])
+        nodes = pipeline.run(documents=documents, num_workers=num_workers)
+    else:
+        nodes = node_parser.get_nodes_from_documents(documents)
     print(f"Documents split into {len(nodes)} chunks.")
     
-    return nodes 
\ No newline at end of file
+    return nodes 
+
+
+def assign_content_ids(nodes):
+    """
+    Replace the random node IDs with hashes of the content each node is embedded from.
+    
+    Unchanged chunks of an edited document keep their ID, so their stored embeddings
+    can be reused; nodes with identical content collapse into one.
+    
+    Args:
+        nodes: List of nodes returned by split_documents_into_nodes
+        
+    Returns:
+        List of nodes with unique content-derived IDs
+    """
+    unique_nodes = {}
+    for node in nodes:
+        # The embed content includes the source file path, so chunks never collide across files
+        content = node.get_content(metadata_mode=MetadataMode.EMBED)
+        node.id_ = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+        unique_nodes.setdefault(node.id_, node)
+    return list(unique_nodes.values())
\ No newline at end of file
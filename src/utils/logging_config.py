@@ -0,0 +1,31 @@
+"""
+Logging configuration for the application.
+"""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from src.config import settings
+
+
+def configure_logging() -> QueueListener:
+    """
+    Route application log records through a queue to a background writer thread.
+    
+    Request handlers only enqueue records, so they never wait on stdout's lock.
+    
+    Returns:
+        The started listener; stop it on shutdown to flush pending records
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    app_logger = logging.getLogger("src")
+    app_logger.setLevel(settings.LOG_LEVEL)
+    app_logger.handlers = [QueueHandler(log_queue)]
+    app_logger.propagate = False
+    
+    listener.start()
+    return listener
\ No newline at end of file
@@ -1,116 +1,189 @@
 """
 Question parsing utilities for extracting structured data from LLM outputs.
 """
-import re
-from typing import List, Dict, Any, Optional
+import logging
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+try:
+    # google-re2 matches in linear time without backtracking; patterns below use only
+    # syntax shared with the stdlib engine (inline flags, no lookarounds)
+    import re2 as re
+except ImportError:
+    import re
+
+
+logger = logging.getLogger(__name__)
+
+
+# Block start markers: "1.", "#1", "Question 1:" first, then "1. Question:" as a fallback
+_BLOCK_START_RE = re.compile(r'(?:\d+\.|#\d+|Question\s+\d+:)\s*')
+_NUMBERED_QUESTION_START_RE = re.compile(r'(?:\d+\.\s*Question:?)\s*')
+# Last resort: any line starting with a number followed by "." or ")"
+_LOOSE_SPLIT_RE = re.compile(r'(?m)^\s*\d+[.)]')
+# Split parts shorter than this cannot hold a question with options
+_MIN_BLOCK_LENGTH = 40
+
+# Line prefixes recognised by the block scanner (compared lowercased)
+_OPTION_LABELS = "ABCD"
+_ANSWER_PREFIXES = ("correct answer", "answer", "correct")
+_EXPLANATION_PREFIX = "explanation:"
+
+# Options, the answer and the explanation can also follow the question on one line ("What is X? A) one B) two
+# Correct Answer: B"); an answer marker takes its letter along, so "Answer: B) text" is not split at "B)"
+_INLINE_FIELD_RE = re.compile(
+    r'(?:^|[ \t])(?P<field>(?P<label>[A-D])[.)][ \t]'
+    r'|(?P<answer>(?i:correct answer|answer|correct))[ \t]*:[ \t]*(?:(?P<letter>[A-Da-d])[.)]?)?'
+    r'|(?i:explanation):)'
+)
+
+# "Question:" / "1." prefixes before the question text, possibly repeated ("Question: 2. ..."), stripped in one match
+_QUESTION_PREFIX_RE = re.compile(r'(?i)^\s*(?:(?:question\s*:|\d+\.)\s*)*')
+
+# A block in streamed output is complete once the next numbered line ("\n2. ...") starts; an
+# explanation may begin after a blank line or span paragraphs, so nothing earlier is a safe cut
+_STREAM_BLOCK_END_RE = re.compile(r'\n\d+\.\s')
+
+
+def _split_on_markers(text: str, marker_re) -> List[str]:
+    """Split text into the segments that follow each marker match."""
+    matches = list(marker_re.finditer(text))
+    ends = [m.start() for m in matches[1:]] + [len(text)]
+    return [text[m.end():end] for m, end in zip(matches, ends)]
 
 
 def _extract_question_blocks(text: str, expected_count: Optional[int] = None) -> List[str]:
     """Extract individual question blocks from LLM response text."""
-    # Try to find all questions in the text
-    pattern1 = r'(?:\d+\.|#\d+|Question\s+\d+:)\s*(.*?)(?=(?:\d+\.|#\d+|Question\s+\d+:)|$)' # "Question 1:", "Question 2:" vs
-    pattern2 = r'(?:\d+\.\s*Question:?)\s*(.*?)(?=(?:\d+\.\s*Question:?)|$)' # "1. Question:", "1. Question", "2. Question:" vs
-    
     # Try with first pattern
-    question_blocks = re.findall(pattern1, text, re.DOTALL)
+    question_blocks = _split_on_markers(text, _BLOCK_START_RE)
     
     # If not found, try with second pattern
     if not question_blocks:
-        question_blocks = re.findall(pattern2, text, re.DOTALL)
+        question_blocks = _split_on_markers(text, _NUMBERED_QUESTION_START_RE)
     
-    # If still not found, try manual splitting
+    # If still not found, split on loose numeric prefixes, or treat the text as a single block
     if not question_blocks and expected_count:
-        print("No pattern matched, trying manual text splitting...")
-        # Split text into approximately equal parts
-        avg_length = len(text) // expected_count
-        question_blocks = []
-        for i in range(expected_count):
-            start_idx = max(0, i * avg_length - 100)  # Start a bit earlier
-            end_idx = min(len(text), (i + 1) * avg_length + 100)  # End a bit later
-            question_blocks.append(text[start_idx:end_idx])
+        logger.debug("No pattern matched, trying loose numeric splitting...")
+        question_blocks = [
+            part for part in _LOOSE_SPLIT_RE.split(text) if len(part.strip()) > _MIN_BLOCK_LENGTH
+        ] or [text]
     
     return question_blocks
 
 
-def _extract_question_text(block: str) -> str:
-    """Extract question text from a question block."""
-    question_text = ""
-    
-    # Try to find the question sentence
-    q_pattern = r'(?:Question)?:?\s*(.*?)(?=\s*(?:A[\.\)]|A\s+\)))'
-    q_match = re.search(q_pattern, block, re.DOTALL | re.IGNORECASE)
-    
-    if q_match:
-        question_text = q_match.group(1).strip()
-    else:
-        # Alternative: use first line as question
-        first_line = block.split('\n')[0].strip()
-        if first_line and not first_line.startswith(('A)', 'B)', 'C)', 'D)')):
-            question_text = first_line
-    
-    # Clean question text
-    for prefix in ["question:", "1.", "2.", "3.", "4.", "5."]:
-        if question_text.lower().startswith(prefix):
-            question_text = question_text[len(prefix):].strip()
-    
-    return question_text
+def _parse_option_line(line: str) -> Optional[str]:
+    """Return the option as "X) text" if the stripped line starts with a label like "A)" or "b.", else None."""
+    if len(line) < 4 or line[0].upper() not in _OPTION_LABELS or line[1] not in ".)" or line[2] not in " \t":
+        return None
+    text = line[3:].strip()
+    return f"{line[0].upper()}) {text}" if text else None
 
 
-def _extract_options(block: str) -> List[str]:
-    """Extract answer options from a question block."""
-    options = []
-    option_patterns = [
-        r'([A-D])[\.\)]\s+(.*?)(?=(?:[A-D][\.\)])|(?:Correct\s+Answer):|$)',
-        r'([A-D])\s*[\.\)]\s+(.*?)(?=(?:[A-D]\s*[\.\)])|(?:Correct\s+Answer):|$)'
-    ]
-    
-    for pattern in option_patterns:
-        options_matches = re.findall(pattern, block, re.DOTALL | re.IGNORECASE)
-        if options_matches:
-            for letter, text in options_matches:
-                options.append(f"{letter}) {text.strip()}")
-            break  # If one pattern matches, don't try others
-    
-    return options
+def _parse_answer_line(lowered: str) -> Optional[str]:
+    """Return the answer letter if the lowercased line is "correct answer: X", "answer: X" or "correct: X"."""
+    for prefix in _ANSWER_PREFIXES:
+        if lowered.startswith(prefix):
+            rest = lowered[len(prefix):].lstrip()
+            if rest.startswith(":"):
+                rest = rest[1:].lstrip()
+                if rest and rest[0].upper() in _OPTION_LABELS:
+                    return rest[0].upper()
+            return None
+    return None
 
 
-def _extract_correct_answer(block: str, options: List[str]) -> str:
-    """Extract correct answer from a question block."""
-    correct_patterns = [
-        r'(?:Correct\s+Answer):\s*([A-D])',
-        r'(?:Answer):\s*([A-D])',
-        r'(?:Correct):\s*([A-D])'
-    ]
-    
-    correct_answer = None
-    for pattern in correct_patterns:
-        correct_match = re.search(pattern, block, re.DOTALL | re.IGNORECASE)
-        if correct_match:
-            correct_answer = correct_match.group(1).strip().upper()
-            break
-    
-    if not correct_answer and options:
-        # If no correct answer is specified, use the first option
-        correct_answer = options[0][0]
+def _iter_fields(block: str) -> Iterator[Tuple[int, str]]:
+    """
+    Yield each field of a block with its offset in the block.
     
-    return correct_answer
+    A field is usually a whole line, but a line is also split before inline options once an "A"
+    option has started, so question text like "Plan B. works" stays intact. Option text may mention
+    answers and explanations too, so an inline answer only starts a field when its letter ends the
+    line or is followed by the explanation, and an inline explanation only after the answer or "D" option.
+    """
+    in_options = after_answer = after_last_option = False
+    offset = 0
+    for line in block.split("\n"):
+        option = _parse_option_line(line.strip())
+        if option is not None:
+            in_options = True
+            after_last_option = after_last_option or option[0] == "D"
+        start = 0
+        for match in _INLINE_FIELD_RE.finditer(line):
+            label = match.group("label")
+            if label:
+                in_options = in_options or label == "A"
+                split = in_options
+                after_last_option = after_last_option or (split and label == "D")
+            elif match.group("answer"):
+                rest = line[match.end():].strip().lower()
+                split = in_options and match.group("letter") is not None and (
+                    not rest or rest.startswith(_EXPLANATION_PREFIX)
+                )
+                after_answer = after_answer or split
+            else:
+                split = in_options and (after_answer or after_last_option)
+            if split:
+                yield offset + start, line[start:match.start("field")]
+                start = match.start("field")
+        yield offset + start, line[start:]
+        offset += len(line) + 1
 
 
-def _extract_explanation(block: str) -> str:
-    """Extract explanation from a question block."""
-    explanation_patterns = [
-        r'(?:Explanation):\s*(.*?)(?=$)',
-        r'(?:Explanation):\s*(.*?)(?=\d+\.\s*Question:|$)'
-    ]
+def _scan_block(block: str) -> Dict[str, Any]:
+    """
+    Scan a question block field by field in a single pass.
     
+    Fields before the first option form the question, "A)"-style fields are options,
+    an answer line gives the correct letter and an explanation runs to the end of the block.
+    
+    Args:
+        block: Text of a single question block
+        
+    Returns:
+        Dictionary with the question prefix, options, correct answer and explanation
+    """
+    question_lines = []
+    options = []
+    correct_answer = None
     explanation = ""
-    for pattern in explanation_patterns:
-        explanation_match = re.search(pattern, block, re.DOTALL | re.IGNORECASE)
-        if explanation_match:
-            explanation = explanation_match.group(1).strip()
+    
+    for offset, field in _iter_fields(block):
+        stripped = field.strip()
+        if not stripped:
+            continue
+        
+        option = _parse_option_line(stripped)
+        if option is not None:
+            options.append(option)
+            continue
+        
+        lowered = stripped.lower()
+        if lowered.startswith(_EXPLANATION_PREFIX):
+            explanation = block[offset:].strip()[len(_EXPLANATION_PREFIX):].strip()
             break
+        
+        answer = _parse_answer_line(lowered)
+        if answer is not None:
+            if correct_answer is None:
+                correct_answer = answer
+            continue
+        
+        if not options:
+            question_lines.append(field)
     
-    return explanation
+    return {
+        "question": "\n".join(question_lines),
+        "options": options,
+        "correct_answer": correct_answer,
+        "explanation": explanation
+    }
+
+
+def _extract_question_text(question_part: str) -> str:
+    """Extract question text from the part of a block preceding the options."""
+    prefix = _QUESTION_PREFIX_RE.match(question_part)
+    return question_part[prefix.end():].strip()
 
 
 def _validate_and_complete_options(options: List[str]) -> List[str]:
@@ -126,40 +199,72 @@ def _validate_and_complete_options(options: List[str]) -> List[str]:
 def _parse_single_question(block: str, block_index: int) -> Optional[Dict[str, Any]]:
     """Parse a single question block into a structured question."""
     try:
-        question_text = _extract_question_text(block)
+        fields = _scan_block(block)
+        
+        question_text = _extract_question_text(fields["question"])
         if not question_text:
-            print(f"No question text found in block {block_index + 1}")
+            logger.debug("No question text found in block %d", block_index + 1)
             return None
         
-        options = _extract_options(block)
+        options = fields["options"]
         if len(options) < 2:
-            print(f"Not enough options found in block {block_index + 1}")
+            logger.debug("Not enough options found in block %d", block_index + 1)
             return None
         
-        correct_answer = _extract_correct_answer(block, options)
+        correct_answer = fields["correct_answer"]
         if not correct_answer:
-            print(f"No correct answer found for block {block_index + 1}, using default: A")
-            correct_answer = "A"
+            # If no correct answer is specified, use the first option
+            logger.debug("No correct answer found for block %d, using default: %s", block_index + 1, options[0][0])
+            correct_answer = options[0][0]
         
-        explanation = _extract_explanation(block)
         options = _validate_and_complete_options(options)
         
         return {
             "question": question_text,
             "options": options,
             "correct_answer": correct_answer,
-            "explanation": explanation
+            "explanation": fields["explanation"]
         }
     
     except Exception as e:
-        print(f"Error parsing block {block_index + 1}: {e}")
+        logger.warning("Error parsing block %d: %s", block_index + 1, e)
         return None
 
 
+def _parse_questions(text: str, expected_count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Parse questions from LLM response text without caching."""
+    questions = []
+    seen = set()
+    
+    # Extract question blocks
+    question_blocks = _extract_question_blocks(text, expected_count)
+    logger.debug("Found %d potential question blocks for parsing.", len(question_blocks))
+    
+    # Parse each block
+    for i, block in enumerate(question_blocks):
+        parsed_question = _parse_single_question(block, i)
+        if parsed_question:
+            # Check for duplicates
+            if parsed_question["question"] not in seen:
+                seen.add(parsed_question["question"])
+                questions.append(parsed_question)
+    
+    return questions
+
+
+@lru_cache(maxsize=128)
+def _parse_cached(text: str, expected_count: Optional[int]) -> Tuple[Dict[str, Any], ...]:
+    """Memoized parse; the text's hash is computed once per string and reused as the key."""
+    return tuple(_parse_questions(text, expected_count))
+
+
 def parse_questions_from_text(text: str, expected_count: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Parse questions from LLM response text.
     
+    Parsing is pure, so results are memoized on (text, expected_count) and
+    re-parsing the same response only costs a cache lookup.
+    
     Args:
         text: LLM response text containing questions
         expected_count: Expected number of questions (for fallback strategies)
@@ -167,18 +272,48 @@ def parse_questions_from_text(text: str, expected_count: Optional[int] = None) -
     Returns:
         List of parsed question dictionaries
     """
-    questions = []
+    # Hand out copies so callers cannot modify the cached results
+    return [{**q, "options": list(q["options"])} for q in _parse_cached(text, expected_count)]
+
+
+def iter_questions_from_stream(chunks: Iterable[str], expected_count: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parse questions incrementally from streamed LLM output.
     
-    # Extract question blocks
-    question_blocks = _extract_question_blocks(text, expected_count)
-    print(f"Found {len(question_blocks)} potential question blocks for parsing.")
+    Text is buffered until a block is known to be complete because the next
+    numbered block has started; every fully delimited prefix is parsed
+    immediately so parsing overlaps generation, and yields the same questions
+    as parsing the whole response at once.
     
-    # Parse each block
-    for i, block in enumerate(question_blocks):
-        parsed_question = _parse_single_question(block, i)
-        if parsed_question:
-            # Check for duplicates
-            if not any(q["question"] == parsed_question["question"] for q in questions):
-                questions.append(parsed_question)
+    Args:
+        chunks: Iterable of response text fragments, in generation order
+        expected_count: Expected number of questions (for fallback strategies)
+        
+    Yields:
+        Parsed question dictionaries as soon as their block is complete
+    """
+    buffer = ""
+    parsed_texts = set()
+    
+    for chunk in chunks:
+        buffer += chunk
+        cut = 0
+        for boundary in _STREAM_BLOCK_END_RE.finditer(buffer):
+            # The next block starts after the newline
+            cut = boundary.start() + 1
+        if not cut:
+            continue
+        
+        complete, buffer = buffer[:cut], buffer[cut:]
+        # Partial stream prefixes are never repeated, so bypass the parse cache
+        for question in _parse_questions(complete):
+            if question["question"] not in parsed_texts:
+                parsed_texts.add(question["question"])
+                yield question
     
-    return questions 
\ No newline at end of file
+    # Only fall back to approximate splitting if nothing could be parsed so far
+    remainder_count = expected_count if not parsed_texts else None
+    for question in _parse_questions(buffer, remainder_count):
+        if question["question"] not in parsed_texts:
+            parsed_texts.add(question["question"])
+            yield question
\ No newline at end of file
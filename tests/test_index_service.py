@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+index_service = pytest.importorskip("src.api.services.index_service")
+from llama_index.core import Document
+
+from src.config import settings
+
+SENTENCES = [f"Sentence number {i} is about topic {i}." for i in range(60)]
+
+
+class FakeEngine:
+    """Stands in for LLMEngine with an in-memory vector store keyed by node ID."""
+
+    def __init__(self):
+        self.index = None
+        self.manifest = {}
+        self.store = set()
+        self.embedded = []
+        self.deleted = []
+
+    def load_index(self):
+        return self.index
+
+    def load_manifest(self):
+        return self.manifest
+
+    def save_manifest(self, manifest):
+        self.manifest = manifest
+
+    def clear_index(self):
+        self.index = None
+        self.store = set()
+        return True
+
+    def create_index(self, nodes):
+        self.index = object()
+        self.store = {node.node_id for node in nodes}
+        self.embedded.extend(node.node_id for node in nodes)
+        return self.index
+
+    def update_index(self, nodes, removed_node_ids):
+        # Mirrors IndexManager.update_index: nodes already stored are not embedded again
+        self.store -= set(removed_node_ids)
+        self.deleted.extend(removed_node_ids)
+        new_ids = [node.node_id for node in nodes if node.node_id not in self.store]
+        self.embedded.extend(new_ids)
+        self.store.update(new_ids)
+        return self.index
+
+
+@pytest.fixture
+def docs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 128)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(settings, "LOAD_WORKERS", 1)
+
+    def load_documents_by_file():
+        return {
+            path: [Document(text=open(path).read(), metadata={"file_path": path}, id_=path)]
+            for path in sorted(str(p) for p in tmp_path.iterdir())
+        }
+
+    monkeypatch.setattr(index_service, "load_documents_by_file", load_documents_by_file)
+    return tmp_path
+
+
+def _write(path, sentences):
+    path.write_text(" ".join(sentences))
+
+
+def _build(docs_dir):
+    engine = FakeEngine()
+    _write(docs_dir / "a.txt", SENTENCES)
+    _write(docs_dir / "b.txt", ["Another file."])
+    service = index_service.IndexService(engine)
+    result, status = service._rebuild_index()
+    assert status == 200
+    engine.embedded.clear()
+    return service, engine
+
+
+def test_first_build_indexes_every_file(docs_dir):
+    service, engine = _build(docs_dir)
+    assert set(engine.manifest) == {str(docs_dir / "a.txt"), str(docs_dir / "b.txt")}
+    assert len(engine.manifest[str(docs_dir / "a.txt")]["node_ids"]) > 2
+    assert engine.store == {node_id for entry in engine.manifest.values() for node_id in entry["node_ids"]}
+
+
+def test_touched_file_with_same_content_is_not_reembedded(docs_dir):
+    service, engine = _build(docs_dir)
+    path = str(docs_dir / "a.txt")
+    before = dict(engine.manifest[path])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    result, status = service._rebuild_index()
+
+    assert status == 200
+    assert engine.embedded == [] and engine.deleted == []
+    after = engine.manifest[path]
+    assert after["node_ids"] == before["node_ids"] and after["hash"] == before["hash"]
+    # The new mtime is recorded, so the next rebuild skips hashing the file
+    assert after["mtime_ns"] == before["mtime_ns"] + 10 ** 9
+
+
+def test_removed_file_drops_its_nodes(docs_dir):
+    service, engine = _build(docs_dir)
+    removed_ids = engine.manifest[str(docs_dir / "b.txt")]["node_ids"]
+    os.remove(docs_dir / "b.txt")
+
+    result, status = service._rebuild_index()
+
+    assert status == 200
+    assert "1 removed" in result["message"]
+    assert sorted(engine.deleted) == sorted(removed_ids)
+    assert engine.embedded == []
+    assert list(engine.manifest) == [str(docs_dir / "a.txt")]
+
+
+def test_edited_file_reuses_unchanged_chunks(docs_dir):
+    service, engine = _build(docs_dir)
+    path = str(docs_dir / "a.txt")
+    old_ids = engine.manifest[path]["node_ids"]
+    # Chunks are packed from the start, so editing the last sentence only changes the last chunk
+    _write(docs_dir / "a.txt", SENTENCES[:-1] + ["Sentence number 59 is about topic 99."])
+
+    result, status = service._rebuild_index()
+
+    assert status == 200
+    new_ids = engine.manifest[path]["node_ids"]
+    assert len(new_ids) == len(old_ids) and new_ids[:-1] == old_ids[:-1]
+    # Only the edited chunk is deleted and embedded again
+    assert engine.deleted == [old_ids[-1]]
+    assert engine.embedded == [new_ids[-1]]
+    assert engine.store == {node_id for entry in engine.manifest.values() for node_id in entry["node_ids"]}
@@ -0,0 +1,171 @@
+import pytest
+
+from src.utils.parser import iter_questions_from_stream, parse_questions_from_text
+
+
+EXPLANATION_AFTER_BLANK_LINE = """1. What is the capital of France?
+A) Berlin
+B) Paris
+C) Rome
+D) Madrid
+Correct Answer: B
+
+Explanation:
+
+Paris has been the capital of France since the 10th century.
+
+2. Which planet is closest to the Sun?
+A) Venus
+B) Earth
+C) Mercury
+D) Mars
+Correct Answer: C
+Explanation: Mercury orbits closest to the Sun.
+"""
+
+MULTI_PARAGRAPH_EXPLANATION = """1. What does HTTP stand for?
+A) HyperText Transfer Protocol
+B) High Transfer Text Protocol
+C) Hyperlink Text Transport Process
+D) Host Transfer Protocol
+Correct Answer: A
+Explanation: HTTP is the protocol used to transfer web pages.
+
+It was first specified in the early 1990s.
+
+2. What port does HTTPS use by default?
+A) 80
+B) 21
+C) 443
+D) 8080
+Correct Answer: C
+Explanation: HTTPS uses port 443 by default.
+"""
+
+INLINE_OPTIONS = (
+    "1. What is the largest ocean? A) Atlantic B) Indian C) Pacific D) Arctic "
+    "Correct Answer: C Explanation: The Pacific covers about a third of the Earth.\n"
+    "2. Which gas do plants absorb? A. Oxygen B. Nitrogen C. Carbon dioxide D. Helium Answer: C\n"
+)
+
+
+def _stream(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("text", [EXPLANATION_AFTER_BLANK_LINE, MULTI_PARAGRAPH_EXPLANATION])
+@pytest.mark.parametrize("size", [1, 7, 64, 100000])
+def test_stream_matches_whole_text(text, size):
+    expected = parse_questions_from_text(text)
+    assert len(expected) == 2
+    assert list(iter_questions_from_stream(_stream(text, size))) == expected
+
+
+def test_explanation_after_blank_line():
+    questions = parse_questions_from_text(EXPLANATION_AFTER_BLANK_LINE)
+    assert questions[0]["explanation"] == "Paris has been the capital of France since the 10th century."
+
+
+def test_multi_paragraph_explanation():
+    questions = parse_questions_from_text(MULTI_PARAGRAPH_EXPLANATION)
+    assert questions[0]["explanation"] == (
+        "HTTP is the protocol used to transfer web pages.\n\nIt was first specified in the early 1990s."
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "1. Question: What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 6\nCorrect Answer: B\nExplanation: Basic arithmetic.",
+    "Question 1: What is 2 + 2?\nA. 3\nB. 4\nC. 5\nD. 6\nAnswer: B\nExplanation: Basic arithmetic.",
+    "#1 What is 2 + 2?\na) 3\nb) 4\nc) 5\nd) 6\nCorrect: b\nExplanation: Basic arithmetic.",
+])
+def test_baseline_formats(text):
+    assert parse_questions_from_text(text) == [{
+        "question": "What is 2 + 2?",
+        "options": ["A) 3", "B) 4", "C) 5", "D) 6"],
+        "correct_answer": "B",
+        "explanation": "Basic arithmetic."
+    }]
+
+
+def test_missing_options_and_answer_are_filled_in():
+    questions = parse_questions_from_text("1. Is water wet?\nA) Yes\nB) No")
+    assert questions[0]["options"] == ["A) Yes", "B) No", "C) [Missing option]", "D) [Missing option]"]
+    assert questions[0]["correct_answer"] == "A"
+
+
+def test_inline_options():
+    questions = parse_questions_from_text(INLINE_OPTIONS)
+    assert questions == [
+        {
+            "question": "What is the largest ocean?",
+            "options": ["A) Atlantic", "B) Indian", "C) Pacific", "D) Arctic"],
+            "correct_answer": "C",
+            "explanation": "The Pacific covers about a third of the Earth."
+        },
+        {
+            "question": "Which gas do plants absorb?",
+            "options": ["A) Oxygen", "B) Nitrogen", "C) Carbon dioxide", "D) Helium"],
+            "correct_answer": "C",
+            "explanation": ""
+        },
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 13, 100000])
+def test_stream_matches_whole_text_for_inline_options(size):
+    expected = parse_questions_from_text(INLINE_OPTIONS)
+    assert len(expected) == 2
+    assert list(iter_questions_from_stream(_stream(INLINE_OPTIONS, size))) == expected
+
+
+def test_question_text_with_option_like_words_is_not_split():
+    questions = parse_questions_from_text(
+        "1. When is Plan B. used?\nA) Never\nB) On failure\nCorrect Answer: B) On failure"
+    )
+    assert questions[0]["question"] == "When is Plan B. used?"
+    assert questions[0]["options"][:2] == ["A) Never", "B) On failure"]
+    assert questions[0]["correct_answer"] == "B"
+
+
+def test_loose_split_fallback():
+    text = (
+        "1) Which language runs in web browsers natively?\nA) JavaScript\nB) COBOL\nCorrect Answer: A\n"
+        "2) Which company created the Python language?\nA) None, Guido van Rossum did\nB) Sun\nCorrect Answer: A\n"
+    )
+    assert parse_questions_from_text(text) == []
+    questions = parse_questions_from_text(text, expected_count=2)
+    assert [q["question"] for q in questions] == [
+        "Which language runs in web browsers natively?",
+        "Which company created the Python language?"
+    ]
+
+
+def test_stream_falls_back_when_nothing_was_parsed():
+    text = "1) Which language runs in web browsers natively?\nA) JavaScript\nB) COBOL\nCorrect Answer: A\n"
+    assert list(iter_questions_from_stream(_stream(text, 5), expected_count=1)) == parse_questions_from_text(text, 1)
+
+
+@pytest.mark.parametrize("text, options, correct_answer, explanation", [
+    (
+        "1. Which is right?\nA) An explanation: none\nB) Yes\nC) No\nD) Maybe\nCorrect Answer: B\nExplanation: Because.",
+        ["A) An explanation: none", "B) Yes", "C) No", "D) Maybe"], "B", "Because."
+    ),
+    (
+        "1. What is six times seven?\nA) 41\nB) The answer: 42\nC) 43\nD) 44\nAnswer: B",
+        ["A) 41", "B) The answer: 42", "C) 43", "D) 44"], "B", ""
+    ),
+    (
+        "1. Which is a vehicle?\nA) Apple\nB) Answer: none\nC) Car\nD) Road\nCorrect Answer: C",
+        ["A) Apple", "B) Answer: none", "C) Car", "D) Road"], "C", ""
+    ),
+    (
+        "1. Which is correct? A) Correct: maybe B) Wrong C) Unknown D) All Answer: D Explanation: All of them.",
+        ["A) Correct: maybe", "B) Wrong", "C) Unknown", "D) All"], "D", "All of them."
+    ),
+])
+def test_option_text_mentioning_answers_and_explanations(text, options, correct_answer, explanation):
+    questions = parse_questions_from_text(text)
+    assert len(questions) == 1
+    assert questions[0]["options"] == options
+    assert questions[0]["correct_answer"] == correct_answer
+    assert questions[0]["explanation"] == explanation
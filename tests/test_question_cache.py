@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.models.question_cache import QuestionCache
+
+
+def _key(context, num_questions=5):
+    return QuestionCache.make_key(context, num_questions)
+
+
+def test_disabled_cache_never_hits():
+    cache = QuestionCache(max_size=0)
+    cache.put(_key("a"), [1.0, 0.0], "response")
+    assert not cache.enabled
+    assert cache.get(_key("a"), [1.0, 0.0]) is None
+
+
+def test_exact_key_hit_without_embedding():
+    cache = QuestionCache(max_size=2)
+    cache.put(_key("a"), [1.0, 0.0], "response")
+    assert cache.get(_key("a")) == "response"
+    assert cache.get(_key("b")) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuestionCache(max_size=2)
+    cache.put(_key("a"), [1.0, 0.0, 0.0], "a")
+    cache.put(_key("b"), [0.0, 1.0, 0.0], "b")
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get(_key("a")) == "a"
+    cache.put(_key("c"), [0.0, 0.0, 1.0], "c")
+    assert cache.get(_key("b")) is None
+    assert cache.get(_key("a")) == "a"
+    assert cache.get(_key("c")) == "c"
+
+
+def test_similar_hit_refreshes_entry():
+    cache = QuestionCache(max_size=2, similarity_threshold=0.97)
+    cache.put(_key("a"), [1.0, 0.0, 0.0], "a")
+    cache.put(_key("b"), [0.0, 1.0, 0.0], "b")
+    assert cache.get(_key("a2"), [1.0, 0.01, 0.0]) == "a"
+    cache.put(_key("c"), [0.0, 0.0, 1.0], "c")
+    assert cache.get(_key("a")) == "a"
+    assert cache.get(_key("b")) is None
+
+
+def test_similarity_threshold():
+    cache = QuestionCache(max_size=4, similarity_threshold=0.97)
+    cache.put(_key("a"), [1.0, 0.0], "a")
+    # Scale does not matter, only the angle between the embeddings
+    assert cache.get(_key("near"), [10.0, 1.0]) == "a"
+    assert cache.get(_key("far"), [1.0, 1.0]) is None
+    assert cache.get(_key("opposite"), np.array([-1.0, 0.0])) is None
+
+
+def test_similar_context_needs_same_question_count():
+    cache = QuestionCache(max_size=4)
+    cache.put(_key("a", 5), [1.0, 0.0], "five")
+    assert cache.get(_key("b", 10), [1.0, 0.0]) is None
+    assert cache.get(_key("a", 10), [1.0, 0.0]) is None
+    cache.put(_key("a", 10), [1.0, 0.0], "ten")
+    assert cache.get(_key("b", 10), [1.0, 0.0]) == "ten"
+    assert cache.get(_key("b", 5), [1.0, 0.0]) == "five"